@@ -2,15 +2,25 @@
 
 
 import base64
+import fnmatch
+import hashlib
 import json
 import os
+import re
 import socket
 import ssl
 import sys
 import threading
+from concurrent.futures import ProcessPoolExecutor
 
 import pandas as pd
 
+# The resource module is only available on Unix
+try:
+    import resource
+except ImportError:
+    resource = None
+
 # Defining the constants
 MAX_THREAD_COUNT = 4
 GITHUB_API = "api.github.com"
@@ -18,6 +28,28 @@ GITHUB_API_RAW = "raw.githubusercontent.com"
 GITHUB_HOST = "github.com"
 GITHUB_PORT = 443
 BUFFER_SIZE = 4096
+FILE_BUFFER_SIZE = 1024 * 1024
+POOL_BUFFER_SIZE = 64 * 1024
+# The contents API inlines files up to 1 MB as base64 with a newline every 60 characters
+INLINE_CONTENT_LIMIT = 1024 * 1024
+INLINE_RESPONSE_SIZE = INLINE_CONTENT_LIMIT * 4 // 3 * 61 // 60 + BUFFER_SIZE
+# The response bytes and str kept by send_request, the parsed content and the copy
+# b64decode makes of it, plus the decoded file
+CONTENTS_RESPONSE_COST = 4 * INLINE_RESPONSE_SIZE + INLINE_CONTENT_LIMIT
+# The contents API lists at most 1000 entries of about 1 KB of JSON, kept as response
+# bytes and str plus the parsed entries of about 4 KB each
+CONTENTS_LISTING_LIMIT = 1000
+LISTING_RESPONSE_COST = CONTENTS_LISTING_LIMIT * 6 * 1024
+# A smaller budget would be exceeded by every single contents or listing request
+MIN_MEMORY_BUDGET = max(CONTENTS_RESPONSE_COST, LISTING_RESPONSE_COST)
+MAX_DOWNLOAD_RETRIES = 3
+VERIFY_PROCESS_COUNT = os.cpu_count() or 1
+PARALLEL_HASH_MIN_BYTES = 16 * 1024 * 1024
+INDEX_DIRECTORY = ".pseudogit"
+INDEX_FILE_NAME = "index"
+DOWNLOAD_DIRECTORY = "downloads"
+IGNORE_FILE_NAME = ".pseudogitignore"
+DEFAULT_IGNORE_PATTERNS = [".git", "__pycache__", "*.pyc", "*.swp", "*~", ".DS_Store"]
 GITHUB_URL = "https://api.github.com"
 
 # Defining the global variables
@@ -25,6 +57,12 @@ access_token = ""
 username = ""
 repository = ""
 branch = "main"
+local_index = {}
+index_lock = threading.Lock()
+max_memory = None
+memory_in_use = 0
+free_buffers = []
+memory_condition = threading.Condition()
 
 
 # Function to create a secure socket
@@ -49,6 +87,126 @@ def create_secure_socket(server_hostname=GITHUB_API):
     return secure_socket
 
 
+def parse_size(size):
+    """
+    Function to parse a size such as 256M, 256MB or 256MiB into bytes
+
+    :param size: The size with an optional K, M or G suffix
+
+    :return: The size in bytes, None if the size is not valid
+    """
+
+    units = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3}
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([KMG]?)(?:I?B)?", size.strip().upper())
+    if match is None:
+        return None
+
+    return int(float(match[1]) * units[match[2]])
+
+
+def get_current_rss():
+    """
+    Function to get the memory the process already uses, such as the interpreter and imports
+
+    :return: The peak resident set size of the process so far in bytes, None if it is unknown
+    """
+
+    if resource is None:
+        return None
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def fits_memory_budget(byte_count):
+    """
+    Function to check if the given bytes fit in the memory budget, call with memory_condition held
+
+    A request always fits when nothing else is in use, so that a budget smaller
+    than a single request does not block forever.
+
+    :param byte_count: The number of bytes to check
+
+    :return: True if the bytes fit in the budget, False otherwise
+    """
+
+    return (
+        max_memory is None
+        or memory_in_use == 0
+        or memory_in_use + byte_count <= max_memory
+    )
+
+
+def reserve_memory(byte_count):
+    """
+    Function to reserve bytes from the memory budget, blocking until they are available
+
+    :param byte_count: The number of bytes to reserve
+    """
+
+    global memory_in_use
+
+    with memory_condition:
+        while not fits_memory_budget(byte_count):
+            # Give back the idle pool buffers before waiting for the busy ones
+            if free_buffers:
+                free_buffers.pop()
+                memory_in_use -= POOL_BUFFER_SIZE
+                continue
+            memory_condition.wait()
+
+        memory_in_use += byte_count
+
+
+def release_memory(byte_count):
+    """
+    Function to release bytes reserved from the memory budget
+
+    :param byte_count: The number of bytes to release
+    """
+
+    global memory_in_use
+
+    with memory_condition:
+        memory_in_use -= byte_count
+        memory_condition.notify_all()
+
+
+def acquire_buffer():
+    """
+    Function to get a buffer from the shared pool, blocking while the memory budget is used up
+
+    :return: The buffer of POOL_BUFFER_SIZE bytes
+    """
+
+    global memory_in_use
+
+    with memory_condition:
+        while True:
+            if free_buffers:
+                return free_buffers.pop()
+
+            if fits_memory_budget(POOL_BUFFER_SIZE):
+                memory_in_use += POOL_BUFFER_SIZE
+                return bytearray(POOL_BUFFER_SIZE)
+
+            memory_condition.wait()
+
+
+def release_buffer(buffer):
+    """
+    Function to return a buffer to the shared pool for reuse
+
+    :param buffer: The buffer to return
+    """
+
+    with memory_condition:
+        free_buffers.append(buffer)
+        memory_condition.notify_all()
+
+
 def send_request(secure_socket, host, port, request):
     """
     Function to send an HTTP request to the server and receive the response
@@ -67,18 +225,18 @@ def send_request(secure_socket, host, port, request):
     secure_socket.sendall(request.encode())
 
     # Receive the response data in chunks
-    response = b""
+    response_chunks = []
     while True:
         response_chunk = secure_socket.recv(BUFFER_SIZE)
         if not response_chunk:
             break
-        response += response_chunk
+        response_chunks.append(response_chunk)
+    response = b"".join(response_chunks)
+    del response_chunks
 
-    # get the response header
-    response_header = response.split(b"\r\n\r\n")[0]
-
-    # get the response body
-    response_body = response.split(b"\r\n\r\n")[1]
+    # get the response header and body, the body itself may contain blank lines
+    response_header, _, response_body = response.partition(b"\r\n\r\n")
+    del response
 
     # get the status code
     status_code = response_header.split(b"\r\n")[0].split(b" ")[1]
@@ -97,16 +255,201 @@ def send_request(secure_socket, host, port, request):
     }
 
 
+def send_request_to_file(
+    secure_socket, host, port, request, file, buffer, expected_status_codes=None
+):
+    """
+    Function to send an HTTP request to the server and stream the response body to a file
+
+    The response is read into the given buffer, so only that buffer is held
+    however large the response is.
+
+    :param secure_socket: The socket object
+    :param host: The host address
+    :param port: The port number
+    :param request: The HTTP request
+    :param file: The file object to write the response body to
+    :param buffer: The buffer from the shared pool to receive the response into
+    :param expected_status_codes: The status codes whose body is written, any other
+        status stops the transfer before the body is written
+
+    :return: The status code of the response, None if no complete header is received
+    """
+
+    # Connect to the server
+    secure_socket.connect((host, port))
+    # Send the request
+    secure_socket.sendall(request.encode())
+
+    # Receive the response data in chunks, writing the body as it arrives
+    response_header = b""
+    header_received = False
+    with memoryview(buffer) as buffer_view:
+        while True:
+            received_size = secure_socket.recv_into(buffer)
+            if not received_size:
+                break
+
+            if header_received:
+                file.write(buffer_view[:received_size])
+                continue
+
+            response_header += buffer_view[:received_size]
+            if b"\r\n\r\n" in response_header:
+                response_header, _, response_body = response_header.partition(
+                    b"\r\n\r\n"
+                )
+                header_received = True
+
+                # get the status code
+                status_code = response_header.split(b"\r\n")[0].split(b" ")[1]
+                if (
+                    expected_status_codes is not None
+                    and status_code not in expected_status_codes
+                ):
+                    break
+
+                file.write(response_body)
+
+    if not header_received:
+        return None
+
+    return status_code
+
+
+def create_blob_hasher(size):
+    """
+    Function to create a SHA-1 hasher primed with the git blob header
+
+    :param size: The size of the file in bytes
+
+    :return: The hasher object, feed it the file content to get the blob SHA
+    """
+
+    hasher = hashlib.sha1()
+    hasher.update(f"blob {size}\0".encode())
+
+    return hasher
+
+
+def compute_file_blob_sha(file_path):
+    """
+    Function to compute the git blob SHA of a local file
+
+    :param file_path: The path of the file
+
+    :return: The blob SHA of the file as a hex string
+    """
+
+    hasher = create_blob_hasher(os.path.getsize(file_path))
+    with open(file_path, "rb") as file:
+        while True:
+            data = file.read(FILE_BUFFER_SIZE)
+            if not data:
+                break
+            hasher.update(data)
+
+    return hasher.hexdigest()
+
+
+def compute_file_blob_shas(file_paths):
+    """
+    Function to compute the git blob SHAs of local files, across all cores when there is enough data
+
+    :param file_paths: The list of file paths
+
+    :return: The list of blob SHAs in the same order as the file paths
+    """
+
+    # Starting the processes costs more than hashing a small amount of data
+    total_size = sum(os.path.getsize(file_path) for file_path in file_paths)
+    if VERIFY_PROCESS_COUNT == 1 or total_size < PARALLEL_HASH_MIN_BYTES:
+        return [compute_file_blob_sha(file_path) for file_path in file_paths]
+
+    # Send the files in batches so that each small file does not cost a round trip
+    chunk_size = max(1, len(file_paths) // (VERIFY_PROCESS_COUNT * 4))
+    with ProcessPoolExecutor(max_workers=VERIFY_PROCESS_COUNT) as executor:
+        return list(
+            executor.map(compute_file_blob_sha, file_paths, chunksize=chunk_size)
+        )
+
+
+def get_download_path(directory, file_name):
+    """
+    Function to get the temporary path a file is downloaded to before it is verified
+
+    :param directory: The directory of the checkout
+    :param file_name: The name of the file
+
+    :return: The temporary path under the index directory, with its parent directories created
+    """
+
+    download_path = f"{directory}/{INDEX_DIRECTORY}/{DOWNLOAD_DIRECTORY}/{file_name}"
+    os.makedirs(os.path.dirname(download_path), exist_ok=True)
+
+    return download_path
+
+
+def move_verified_file(download_path, file_path, sha, expected_sha):
+    """
+    Function to move a downloaded file into place if its blob SHA matches, deleting it otherwise
+
+    :param download_path: The temporary path of the downloaded file
+    :param file_path: The final path of the file
+    :param sha: The blob SHA computed while the file was written
+    :param expected_sha: The blob SHA from the API
+
+    :return: The blob SHA of the file if it matches, None otherwise
+    """
+
+    if sha != expected_sha:
+        print(f"Checksum mismatch for file {file_path}")
+        os.remove(download_path)
+        return None
+
+    os.replace(download_path, file_path)
+
+    return expected_sha
+
+
 def get_file_from_github(file_name, directory="pseudo_git_downloads", parallel_count=4):
     """
-    Function to get a file from GitHub
+    Function to get a file from GitHub, retrying when a request or the checksum fails
 
     :param file_name: The name of the file
     :param directory: The directory to save the file
     :param parallel_count: The number of parallel threads to download the file
-    :param file_name: The name of the output file
 
-    :return: None
+    :return: True if the file is verified against its blob SHA, False otherwise
+    """
+
+    for attempt in range(1, MAX_DOWNLOAD_RETRIES + 1):
+        sha = download_and_verify_file(file_name, directory, parallel_count)
+        if sha is not None:
+            # Record the verified file in the local index
+            with index_lock:
+                local_index[file_name] = create_index_entry(
+                    f"{directory}/{file_name}", sha
+                )
+            return True
+
+        print(
+            f"Download attempt {attempt}/{MAX_DOWNLOAD_RETRIES} failed for file {file_name}"
+        )
+
+    print(f"Failed to download file {file_name}")
+    return False
+
+
+def fetch_file_contents(file_name, directory):
+    """
+    Function to get the contents of a file, writing it directly when the content is inline
+
+    :param file_name: The name of the file
+    :param directory: The directory to save the file
+
+    :return: The download URL (None when the file is already written), the file size
+        and the blob SHA of the file (None when the written file does not match it)
     """
 
     # Create a secure socket
@@ -129,43 +472,92 @@ def get_file_from_github(file_name, directory="pseudo_git_downloads", parallel_c
     # Parse the response
     response_body = json.loads(response["response_body"])
     content = response_body["content"]
+    file_size = response_body["size"]
+    expected_sha = response_body["sha"]
+    file_path = f"{directory}/{file_name}"
 
-    # if the file exists in the directory and does have the same size, do not download it again
+    # if the file exists in the directory and has the same blob SHA, do not download it again
     split_path = file_name.split("/")
     new_directory_path = directory
     for path in split_path[:-1]:
         new_directory_path += f"/{path}"
     if split_path[-1] in os.listdir(new_directory_path):
-        file_size = os.path.getsize(directory + "/" + file_name)
-        if file_size == response_body["size"]:
+        if (
+            os.path.getsize(file_path) == file_size
+            and get_indexed_blob_sha(file_name, file_path) == expected_sha
+        ):
             print(f"File {file_name} already exists in the directory")
-            return
+            return None, file_size, expected_sha
 
     print(f"Downloading file {file_name}")
 
     # If the response_body is not empty write the content to the file
     if content:
         content = base64.b64decode(content)
-        with open(f"{directory}/{file_name}", "wb") as file:
+        hasher = create_blob_hasher(len(content))
+        download_path = get_download_path(directory, file_name)
+        with open(download_path, "wb") as file:
+            hasher.update(content)
             file.write(content)
 
-        return
+        sha = move_verified_file(
+            download_path, file_path, hasher.hexdigest(), expected_sha
+        )
 
-    # Get the file size and the download URL
-    file_size = response_body["size"]
-    download_url = response_body["download_url"]
+        return None, file_size, sha
+
+    return response_body["download_url"], file_size, expected_sha
+
+
+def download_and_verify_file(file_name, directory, parallel_count):
+    """
+    Function to download a file once, hashing it while it is written
+
+    :param file_name: The name of the file
+    :param directory: The directory to save the file
+    :param parallel_count: The number of parallel threads to download the file
+
+    :return: The blob SHA of the file if the written file matches it, None otherwise
+    """
+
+    # The contents response holds the base64 content of files up to 1 MB
+    reserve_memory(CONTENTS_RESPONSE_COST)
+    try:
+        download_url, file_size, expected_sha = fetch_file_contents(
+            file_name, directory
+        )
+    finally:
+        release_memory(CONTENTS_RESPONSE_COST)
+
+    # The file is already written or skipped when it fits in the contents response
+    if download_url is None:
+        return expected_sha
 
     # Calculate the chunk size
     chunk_size = file_size // parallel_count
 
-    # Create the threads
+    # Create the threads, the chunks go under the index directory so status skips them
+    chunk_paths = [
+        get_download_path(directory, f"{file_name}_{i}") for i in range(parallel_count)
+    ]
+    # A range comes back as partial content, or as the whole file if it is the only range
+    expected_status_codes = [b"206"] if parallel_count > 1 else [b"206", b"200"]
+    chunk_statuses = [None] * parallel_count
     threads = []
     for i in range(parallel_count):
         start = i * chunk_size
-        end = (i + 1) * chunk_size - 1 if i < parallel_count - 1 else file_size
+        end = (i + 1) * chunk_size - 1 if i < parallel_count - 1 else file_size - 1
         thread = threading.Thread(
             target=download_file_chunk,
-            args=(download_url, start, end, f"{file_name}_{i}", directory),
+            args=(
+                download_url,
+                start,
+                end,
+                chunk_paths[i],
+                expected_status_codes,
+                chunk_statuses,
+                i,
+            ),
         )
         threads.append(thread)
         thread.start()
@@ -174,31 +566,57 @@ def get_file_from_github(file_name, directory="pseudo_git_downloads", parallel_c
     for thread in threads:
         thread.join()
 
-    # Concatenate the chunks
-    with open(f"{directory}/{file_name}", "wb") as file:
-        for i in range(parallel_count):
-            with open(f"{directory}/{file_name}_{i}", "rb") as chunk_file:
-                file.write(chunk_file.read())
+    # Do not concatenate the chunks when a range request failed
+    for status_code in chunk_statuses:
+        if status_code not in expected_status_codes:
+            status = status_code.decode() if status_code else "missing"
+            print(f"Failed to download a chunk of file {file_name}, status code {status}")
+            for chunk_path in chunk_paths:
+                if os.path.isfile(chunk_path):
+                    os.remove(chunk_path)
+            return None
+
+    # Concatenate the chunks through a pool buffer, hashing the bytes as they are written
+    hasher = create_blob_hasher(file_size)
+    download_path = get_download_path(directory, file_name)
+    buffer = acquire_buffer()
+    try:
+        with memoryview(buffer) as buffer_view, open(download_path, "wb") as file:
+            for chunk_path in chunk_paths:
+                with open(chunk_path, "rb") as chunk_file:
+                    while True:
+                        read_size = chunk_file.readinto(buffer)
+                        if not read_size:
+                            break
+                        hasher.update(buffer_view[:read_size])
+                        file.write(buffer_view[:read_size])
+    finally:
+        release_buffer(buffer)
 
     # Remove the chunk files
-    for i in range(parallel_count):
-        os.remove(f"{directory}/{file_name}_{i}")
+    for chunk_path in chunk_paths:
+        os.remove(chunk_path)
+
+    return move_verified_file(
+        download_path, f"{directory}/{file_name}", hasher.hexdigest(), expected_sha
+    )
 
 
-def download_file_chunk(url, start, end, file_name, directory):
+def download_file_chunk(
+    url, start, end, chunk_path, expected_status_codes, chunk_statuses, chunk_index
+):
     """
     Function to download a file chunk
 
     :param url: The URL of the file
     :param start: The start byte of the chunk
     :param end: The end byte of the chunk
-    :param file_name: The name of the output file
-    :param directory: The directory to save the file
+    :param chunk_path: The path of the output file
+    :param expected_status_codes: The status codes of a valid response
+    :param chunk_statuses: The list to store the status code of the chunk in
+    :param chunk_index: The index of the chunk in the list
     """
 
-    # Create a secure socket
-    secure_socket = create_secure_socket(GITHUB_API_RAW)
-
     # Construct the request
     request = f"GET {url} HTTP/1.1\r\n"
     request += f"Host: {GITHUB_API_RAW}\r\n"
@@ -206,18 +624,29 @@ def download_file_chunk(url, start, end, file_name, directory):
     request += f"Range: bytes={start}-{end}\r\n"
     request += "Connection: close\r\n\r\n"
 
-    # Send the request and receive the response
-    response = send_request(secure_socket, GITHUB_API_RAW, GITHUB_PORT, request)
-
-    # Close the socket
-    secure_socket.close()
-
-    # Parse the response
-    response_body = response["response_body_bytes"]
-
-    # Write the content to the file
-    with open(f"{directory}/{file_name}", "wb") as file:
-        file.write(response_body)
+    # Wait for a pool buffer before connecting, so that no connection sits idle
+    # receiving data while the memory budget is used up
+    buffer = acquire_buffer()
+    try:
+        # Create a secure socket
+        secure_socket = create_secure_socket(GITHUB_API_RAW)
+
+        # Send the request and stream the response to the file
+        with open(chunk_path, "wb") as file:
+            chunk_statuses[chunk_index] = send_request_to_file(
+                secure_socket,
+                GITHUB_API_RAW,
+                GITHUB_PORT,
+                request,
+                file,
+                buffer,
+                expected_status_codes,
+            )
+
+        # Close the socket
+        secure_socket.close()
+    finally:
+        release_buffer(buffer)
 
 
 def get_repository_contents(path=""):
@@ -241,6 +670,46 @@ def get_repository_contents(path=""):
     request += "Accept: application/vnd.github.v3+json\r\n"
     request += "Connection: close\r\n\r\n"
 
+    # The listing response is held in memory until it is parsed
+    reserve_memory(LISTING_RESPONSE_COST)
+    try:
+        # Send the request and receive the response
+        response = send_request(secure_socket, GITHUB_API, GITHUB_PORT, request)
+
+        # Close the socket
+        secure_socket.close()
+
+        # Parse the response
+        response_body = json.loads(response["response_body"])
+
+        # Get the list of files
+        files = [[file["path"], file["type"]] for file in response_body]
+    finally:
+        release_memory(LISTING_RESPONSE_COST)
+
+    return files
+
+
+def get_repository_tree(tree_ref="HEAD"):
+    """
+    Function to get the whole file tree of the repository in one request
+
+    :param tree_ref: The branch, tag or commit SHA of the tree, defaults to the default branch
+
+    :return: The dictionary of file paths to their blob SHAs, None if the request fails
+    """
+
+    # Create a secure socket
+    secure_socket = create_secure_socket()
+
+    # Construct the request
+    request = f"GET /repos/{username}/{repository}/git/trees/{tree_ref}?recursive=1 HTTP/1.1\r\n"
+    request += f"Host: {GITHUB_API}\r\n"
+    request += f"Authorization: token {access_token}\r\n"
+    request += "User-Agent: PseudoGit\r\n"
+    request += "Accept: application/vnd.github.v3+json\r\n"
+    request += "Connection: close\r\n\r\n"
+
     # Send the request and receive the response
     response = send_request(secure_socket, GITHUB_API, GITHUB_PORT, request)
 
@@ -248,12 +717,22 @@ def get_repository_contents(path=""):
     secure_socket.close()
 
     # Parse the response
-    response_body = json.loads(response["response_body"])
+    if response["status_code"] != b"200":
+        print(f"Failed to get the repository tree of {tree_ref}")
+        return None
 
-    # Get the list of files
-    files = [[file["path"], file["type"]] for file in response_body]
+    response_body = json.loads(response["response_body"])
+    if response_body.get("truncated"):
+        print("Warning: the repository tree is truncated, some files are not listed")
+
+    # Get the blob SHA of every file
+    tree = {
+        entry["path"]: entry["sha"]
+        for entry in response_body["tree"]
+        if entry["type"] == "blob"
+    }
 
-    return files
+    return tree
 
 
 def download_files(files, directory="pseudo_git_downloads", parallel_count=4):
@@ -298,6 +777,334 @@ def download_files(files, directory="pseudo_git_downloads", parallel_count=4):
         thread.join()
 
 
+def verify_files(directory):
+    """
+    Function to verify a local checkout against the remote tree, hashing files in parallel
+
+    :param directory: The directory of the checkout
+
+    :return: True if every remote file exists locally with the same blob SHA
+    """
+
+    remote_tree = get_repository_tree()
+    if remote_tree is None:
+        return False
+
+    # Hash the local files that exist in the remote tree
+    local_files = [
+        path for path in remote_tree if os.path.isfile(f"{directory}/{path}")
+    ]
+    local_shas = compute_file_blob_shas([f"{directory}/{path}" for path in local_files])
+    local_tree = dict(zip(local_files, local_shas))
+
+    missing_files = [path for path in remote_tree if path not in local_tree]
+    mismatched_files = [
+        path for path in local_tree if local_tree[path] != remote_tree[path]
+    ]
+
+    for path in missing_files:
+        print(f"Missing file {path}")
+    for path in mismatched_files:
+        print(f"Checksum mismatch for file {path}")
+
+    if missing_files or mismatched_files:
+        print(
+            f"Verification failed: {len(mismatched_files)} mismatched, {len(missing_files)} missing"
+        )
+        return False
+
+    print(f"Verified {len(local_tree)} files")
+    return True
+
+
+def get_index_path(directory):
+    """
+    Function to get the path of the local index file of a directory
+
+    :param directory: The directory of the checkout
+
+    :return: The path of the index file
+    """
+
+    return f"{directory}/{INDEX_DIRECTORY}/{INDEX_FILE_NAME}"
+
+
+def create_index_entry(file_path, sha):
+    """
+    Function to create an index entry from the current stat of a file
+
+    :param file_path: The path of the file
+    :param sha: The blob SHA of the file
+
+    :return: The index entry with the size, modification time and blob SHA
+    """
+
+    file_stat = os.stat(file_path)
+
+    return {"size": file_stat.st_size, "mtime": file_stat.st_mtime_ns, "sha": sha}
+
+
+def get_indexed_blob_sha(file_name, file_path):
+    """
+    Function to get the blob SHA of a file from the local index, hashing it only if it changed
+
+    :param file_name: The name of the file in the repository
+    :param file_path: The local path of the file
+
+    :return: The blob SHA of the file
+    """
+
+    with index_lock:
+        entry = local_index.get(file_name)
+
+    file_stat = os.stat(file_path)
+    if (
+        entry is not None
+        and entry["size"] == file_stat.st_size
+        and entry["mtime"] == file_stat.st_mtime_ns
+    ):
+        return entry["sha"]
+
+    return compute_file_blob_sha(file_path)
+
+
+def load_index(directory):
+    """
+    Function to load the local index of a directory
+
+    :param directory: The directory of the checkout
+
+    :return: The dictionary of file paths to their index entries
+    """
+
+    index_path = get_index_path(directory)
+    if not os.path.isfile(index_path):
+        return {}
+
+    with open(index_path, "r") as file:
+        return json.load(file)
+
+
+def save_index(directory, index):
+    """
+    Function to save the local index of a directory
+
+    :param directory: The directory of the checkout
+    :param index: The dictionary of file paths to their index entries
+    """
+
+    os.makedirs(f"{directory}/{INDEX_DIRECTORY}", exist_ok=True)
+
+    # Write to a temporary file first so that an interrupted write keeps the old index
+    index_path = get_index_path(directory)
+    with open(f"{index_path}.tmp", "w") as file:
+        json.dump(index, file, indent=1, sort_keys=True)
+    os.replace(f"{index_path}.tmp", index_path)
+
+
+def load_ignore_patterns(directory):
+    """
+    Function to load the ignore patterns of a directory
+
+    The default patterns are extended with the lines of the .pseudogitignore
+    file at the root of the directory, lines starting with # are comments.
+
+    :param directory: The directory of the checkout
+
+    :return: The list of fnmatch patterns
+    """
+
+    ignore_patterns = DEFAULT_IGNORE_PATTERNS + [INDEX_DIRECTORY]
+
+    ignore_file_path = f"{directory}/{IGNORE_FILE_NAME}"
+    if os.path.isfile(ignore_file_path):
+        with open(ignore_file_path, "r") as file:
+            for line in file:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    ignore_patterns.append(line.rstrip("/"))
+
+    return ignore_patterns
+
+
+def is_ignored(path, ignore_patterns):
+    """
+    Function to check if a path or one of its parent directories matches an ignore pattern
+
+    A pattern matches either the name or the whole relative path of a file or directory.
+
+    :param path: The path relative to the directory, separated by "/"
+    :param ignore_patterns: The list of fnmatch patterns
+
+    :return: True if the path is ignored, False otherwise
+    """
+
+    split_path = path.split("/")
+    for i in range(len(split_path)):
+        name = split_path[i]
+        partial_path = "/".join(split_path[: i + 1])
+        for pattern in ignore_patterns:
+            if fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(partial_path, pattern):
+                return True
+
+    return False
+
+
+def list_local_files(directory, ignore_patterns=None):
+    """
+    Function to list the files under a directory, skipping the index directory and ignored paths
+
+    :param directory: The directory to list
+    :param ignore_patterns: The list of fnmatch patterns, loaded from the directory by default
+
+    :return: The list of file paths relative to the directory, separated by "/"
+    """
+
+    if ignore_patterns is None:
+        ignore_patterns = load_ignore_patterns(directory)
+
+    local_files = []
+    for root, directory_names, file_names in os.walk(directory):
+        relative_root = os.path.relpath(root, directory).replace(os.sep, "/")
+        prefix = "" if relative_root == "." else f"{relative_root}/"
+
+        # Do not descend into the ignored directories
+        directory_names[:] = [
+            directory_name
+            for directory_name in directory_names
+            if not is_ignored(prefix + directory_name, ignore_patterns)
+        ]
+
+        for file_name in file_names:
+            if not is_ignored(prefix + file_name, ignore_patterns):
+                local_files.append(prefix + file_name)
+
+    return local_files
+
+
+def get_local_changes(directory, remote_tree):
+    """
+    Function to find the local changes against the remote tree using the local index
+
+    Files whose size and modification time match the index are not read again,
+    the others are hashed and the index is refreshed with them.
+
+    :param directory: The directory of the checkout
+    :param remote_tree: The dictionary of remote file paths to their blob SHAs
+
+    :return: The lists of added, modified and deleted file paths, and the updated index
+    """
+
+    index = load_index(directory)
+    index_path = get_index_path(directory)
+    index_mtime = os.stat(index_path).st_mtime_ns if os.path.isfile(index_path) else 0
+    ignore_patterns = load_ignore_patterns(directory)
+
+    # Use stat to find the files that may have changed since they were indexed
+    local_files = list_local_files(directory, ignore_patterns)
+    updated_index = {}
+    suspect_files = []
+    for path in local_files:
+        entry = index.get(path)
+        file_stat = os.stat(f"{directory}/{path}")
+        if (
+            entry is not None
+            and entry["size"] == file_stat.st_size
+            and entry["mtime"] == file_stat.st_mtime_ns
+            # A file modified in the same instant as the index write may still change
+            and entry["mtime"] < index_mtime
+        ):
+            updated_index[path] = entry
+        else:
+            suspect_files.append(path)
+
+    # Hash only the suspect files
+    suspect_shas = compute_file_blob_shas(
+        [f"{directory}/{path}" for path in suspect_files]
+    )
+    for path, sha in zip(suspect_files, suspect_shas):
+        updated_index[path] = create_index_entry(f"{directory}/{path}", sha)
+
+    added_files = sorted(path for path in updated_index if path not in remote_tree)
+    modified_files = sorted(
+        path
+        for path in updated_index
+        if path in remote_tree and updated_index[path]["sha"] != remote_tree[path]
+    )
+    # Ignored remote files are left alone rather than reported as deleted
+    deleted_files = sorted(
+        path
+        for path in remote_tree
+        if path not in updated_index and not is_ignored(path, ignore_patterns)
+    )
+
+    return added_files, modified_files, deleted_files, updated_index
+
+
+def print_status(directory):
+    """
+    Function to print the local changes of a directory against the remote tree
+
+    :param directory: The directory of the checkout
+    """
+
+    if not os.path.isfile(get_index_path(directory)):
+        print(f"Invalid directory {directory}, it is not cloned with PseudoGit")
+        return
+
+    remote_tree = get_repository_tree()
+    if remote_tree is None:
+        return
+
+    added_files, modified_files, deleted_files, index = get_local_changes(
+        directory, remote_tree
+    )
+    save_index(directory, index)
+
+    if not added_files and not modified_files and not deleted_files:
+        print("No changes against the default branch")
+        return
+
+    print("Changes against the default branch:")
+    for path in added_files:
+        print(f"    added:    {path}")
+    for path in modified_files:
+        print(f"    modified: {path}")
+    for path in deleted_files:
+        print(f"    deleted:  {path}")
+
+
+def upload_changes(directory, branch_name):
+    """
+    Function to push only the added and modified files of a directory
+
+    :param directory: The directory of the checkout
+    :param branch_name: The name of the branch to push to
+    """
+
+    # Only a clone root maps its local paths to the repository paths
+    if not os.path.isfile(get_index_path(directory)):
+        print(f"Invalid directory {directory}, it is not cloned with PseudoGit")
+        return
+
+    remote_tree = get_repository_tree(branch_name)
+    if remote_tree is None:
+        return
+
+    added_files, modified_files, _, index = get_local_changes(directory, remote_tree)
+
+    if not added_files and not modified_files:
+        print(f"No changes to push to branch {branch_name}")
+    for path in added_files + modified_files:
+        if not push_changes(
+            path, branch_name, directory=directory, remote_tree=remote_tree
+        ):
+            # Keep the file as changed in the index so that it is pushed next time
+            del index[path]
+
+    save_index(directory, index)
+
+
 def get_latest_commit_sha():
     """
     Function to get the latest commit SHA
@@ -435,19 +1242,30 @@ def delete_branch(branch_name):
         print(f"Failed to delete branch {branch_name}")
 
 
-def push_changes(file_name, branch_name, message="Pushed changes"):
+def push_changes(
+    file_name, branch_name, message="Pushed changes", directory=None, remote_tree=None
+):
     """
     Function to push the changes to the repository
 
     :param file_name: The name of the file to push
     :param branch_name: The name of the branch to push to
+    :param message: The commit message
+    :param directory: The local directory the file name is relative to
+    :param remote_tree: The remote tree of the branch, to avoid looking up the file SHA
+
+    :return: True if the changes are pushed successfully, False otherwise
     """
 
     # Get the file SHA
-    sha = get_file_sha(file_name)
+    if remote_tree is None:
+        sha = get_file_sha(file_name)
+    else:
+        sha = remote_tree.get(file_name)
 
     # Read the file content
-    with open(file_name, "rb") as file:
+    file_path = f"{directory}/{file_name}" if directory else file_name
+    with open(file_path, "rb") as file:
         content = file.read()
 
     # Encode the file content
@@ -488,12 +1306,15 @@ def push_changes(file_name, branch_name, message="Pushed changes"):
         print(
             f"Changes pushed successfully to branch {branch_name} and file {file_name} updated"
         )
+        return True
     elif response["status_code"] == b"201":
         print(
             f"Changes pushed successfully to branch {branch_name} and file {file_name} created"
         )
+        return True
     else:
         print(f"Failed to push changes to branch {branch_name}")
+        return False
 
 
 def create_pull_request(title, body, head, base):
@@ -642,9 +1463,9 @@ def main():
     print(
         """Usage of the PseudoGit:
         Core commands:
-        python PseudoGit.py clone <username>/<repository_name> <parallel_count>
+        python PseudoGit.py clone <username>/<repository_name> <parallel_count> [--max-memory <size>]
         python PseudoGit.py branch <username>/<repository_name> <branch_name>
-        python PseudoGit.py upload <username>/<repository_name> <branch_name> <file_name>
+        python PseudoGit.py upload <username>/<repository_name> <branch_name> <file_name or cloned directory>
         python PseudoGit.py create-pr <username>/<repository_name> <branch_name>
         python PseudoGit.py list-pr <username>/<repository_name>
         python PseudoGit.py merge-pr <username>/<repository_name> <pr_number>
@@ -652,11 +1473,42 @@ def main():
         Additional commands:
         python PseudoGit.py delete-branch <username>/<repository_name> <branch_name>
         python PseudoGit.py close-pr <username>/<repository_name> <pr_number>
+        python PseudoGit.py verify <username>/<repository_name> <directory>
+        python PseudoGit.py status <username>/<repository_name> <directory>
         
+        The --max-memory option caps the memory of the process, such as 256M. The memory
+        already in use at startup is taken out of it and the rest bounds the downloads
+        in flight. Thread stacks and socket buffers are not counted.
+
         Additionally, you need to enter your access token when prompted.
         """
     )
 
+    # Take the memory budget option out of the arguments, e.g. --max-memory 256M
+    global max_memory
+    if "--max-memory" in sys.argv:
+        option_index = sys.argv.index("--max-memory")
+        if option_index + 1 == len(sys.argv):
+            print("Invalid memory budget, expected a size such as 256M")
+            return
+
+        max_memory = parse_size(sys.argv[option_index + 1])
+        if max_memory is None:
+            print("Invalid memory budget, expected a size such as 256M")
+            return
+
+        # Only what is left after the interpreter and the imports is for the downloads
+        baseline_memory = get_current_rss() or 0
+        if max_memory - baseline_memory < MIN_MEMORY_BUDGET:
+            print(
+                f"Invalid memory budget, it must be at least {(MIN_MEMORY_BUDGET + baseline_memory) // 1024} KiB"
+                f" since {baseline_memory // 1024} KiB are already in use"
+            )
+            return
+        max_memory -= baseline_memory
+
+        del sys.argv[option_index : option_index + 2]
+
     if len(sys.argv) < 3:
         print("Invalid number of arguments")
         return
@@ -675,7 +1527,17 @@ def main():
         files = get_repository_contents()
         if repository not in os.listdir():
             os.mkdir(repository)
+        local_index.update(load_index(repository))
         download_files(files, repository, parallel_count)
+        save_index(repository, local_index)
+
+    if command == "verify":
+        directory = sys.argv[3] if len(sys.argv) == 4 else repository
+        verify_files(directory)
+
+    if command == "status":
+        directory = sys.argv[3] if len(sys.argv) == 4 else repository
+        print_status(directory)
 
     if command == "branch":
         branch_name = sys.argv[3]
@@ -688,7 +1550,10 @@ def main():
     if command == "upload":
         branch_name = sys.argv[3]
         file_name = sys.argv[4]
-        push_changes(file_name, branch_name)
+        if os.path.isdir(file_name):
+            upload_changes(file_name, branch_name)
+        else:
+            push_changes(file_name, branch_name)
 
     if command == "create-pr":
         branch_name = sys.argv[3]